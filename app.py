@@ -7,6 +7,12 @@ from datetime import datetime
 import plotly.graph_objects as go
 import plotly.express as px
 
+from utils import (
+    build_fast_predictor,
+    calculate_ocean_proximity,
+    engineer_batch_features,
+)
+
 # Configuración de la página
 st.set_page_config(
     page_title="Sistema de Predicción de Tsunamis",
@@ -23,7 +29,17 @@ def load_model():
         model = joblib.load('model.pkl')
         scaler = joblib.load('scaler.pkl')
         with open('features.json', 'r') as f:
-            feature_names = json.load(f)
+            feature_names = tuple(json.load(f))
+        # Fijar float32 de extremo a extremo: los árboles de sklearn ya
+        # recorren float32 internamente, así el escalado no promociona
+        # la entrada a float64
+        scaler.mean_ = scaler.mean_.astype(np.float32)
+        scaler.scale_ = scaler.scale_.astype(np.float32)
+        # Calentamiento: la primera predicción paga la inicialización de
+        # rutas Cython y cachés de dispatch de NumPy; hacerla aquí la deja
+        # pagada una sola vez por proceso (load_model es cache_resource)
+        warmup = np.zeros((1, len(feature_names)), dtype=np.float32)
+        model.predict_proba(scaler.transform(warmup))
         return model, scaler, feature_names
     except Exception as e:
         st.error(f"Error al cargar el modelo: {e}")
@@ -31,51 +47,86 @@ def load_model():
 
 model, scaler, feature_names = load_model()
 
-# Función para calcular proximidad a océanos
-def calculate_ocean_proximity(lat, lon):
-    """Calcula si está cerca de zonas de riesgo de tsunami"""
-    pacific_ring = (
-        ((lat > -60) & (lat < 60)) &
-        (((lon > 120) & (lon < 180)) | ((lon > -180) & (lon < -60)))
-    )
-    indian_ocean = ((lat > -45) & (lat < 25)) & ((lon > 40) & (lon < 120))
-    caribbean = ((lat > 5) & (lat < 25)) & ((lon > -90) & (lon < -55))
-    return int(pacific_ring or indian_ocean or caribbean)
+# Posición de cada característica en el vector de entrada del modelo
+feature_index = (
+    {name: i for i, name in enumerate(feature_names)} if feature_names else {}
+)
+
+# Predictor por lotes, compilado a ONNX si skl2onnx/onnxruntime están
+# instalados; si no, sklearn directamente
+@st.cache_resource
+def _fast_predictor():
+    """Predictor por lotes construido una sola vez por proceso"""
+    return build_fast_predictor(model, scaler, len(feature_names))
 
 # Función para ingeniería de características
 def engineer_features(data):
     """Genera características adicionales"""
-    data['ocean_proximity'] = calculate_ocean_proximity(
+    magnitude = data['magnitude']
+    depth = data['depth']
+    mmi = data.get('mmi', 0)
+    sig = data.get('sig', 0)
+
+    data['ocean_proximity'] = int(calculate_ocean_proximity(
         data['latitude'], data['longitude']
-    )
-    data['mag_depth_ratio'] = data['magnitude'] / (data['depth'] + 1)
-    data['intensity_score'] = (
-        data['magnitude'] * 0.5 +
-        data.get('mmi', 0) * 0.3 +
-        data.get('sig', 0) / 100 * 0.2
-    )
-    data['shallow_strong'] = int(
-        (data['depth'] < 70) and (data['magnitude'] > 7.5)
-    )
+    ))
+    data['mag_depth_ratio'] = magnitude / (depth + 1)
+    data['intensity_score'] = magnitude * 0.5 + mmi * 0.3 + sig / 100 * 0.2
+    data['shallow_strong'] = int((depth < 70) and (magnitude > 7.5))
     return data
 
+# Función interna de predicción, cacheada sobre entradas ya redondeadas
+@st.cache_data(max_entries=256, show_spinner=False)
+def _predict(magnitude, depth, latitude, longitude, cdi, mmi, sig, nst,
+             dmin, gap, year, month):
+    """Ejecuta escalado y modelo para una combinación concreta de entradas"""
+    processed = engineer_features({
+        'magnitude': magnitude,
+        'depth': depth,
+        'latitude': latitude,
+        'longitude': longitude,
+        'cdi': cdi,
+        'mmi': mmi,
+        'sig': sig,
+        'nst': nst,
+        'dmin': dmin,
+        'gap': gap,
+        'Year': year,
+        'Month': month
+    })
+
+    # Preparar datos para predicción (vector preasignado, sin DataFrame)
+    X = np.empty((1, len(feature_names)), dtype=np.float32)
+    for name, i in feature_index.items():
+        X[0, i] = processed[name]
+    X_scaled = scaler.transform(X)
+
+    probability = float(model.predict_proba(X_scaled)[0][1])
+    prediction = int(model.predict(X_scaled)[0])
+    return probability, prediction
+
 # Función de predicción
 def predict_tsunami(earthquake_data):
     """Predice el riesgo de tsunami"""
     if model is None:
         return None
-    
-    # Ingeniería de características
-    processed = engineer_features(earthquake_data.copy())
-    
-    # Preparar datos para predicción
-    X = pd.DataFrame([processed])[feature_names]
-    X_scaled = scaler.transform(X)
-    
-    # Predicción
-    probability = model.predict_proba(X_scaled)[0][1]
-    prediction = model.predict(X_scaled)[0]
-    
+
+    # Redondear los floats para estabilizar la clave de caché
+    probability, prediction = _predict(
+        round(earthquake_data['magnitude'], 2),
+        round(earthquake_data['depth'], 1),
+        round(earthquake_data['latitude'], 3),
+        round(earthquake_data['longitude'], 3),
+        round(earthquake_data.get('cdi', 0), 1),
+        round(earthquake_data.get('mmi', 0), 1),
+        int(earthquake_data.get('sig', 0)),
+        int(earthquake_data.get('nst', 0)),
+        round(earthquake_data.get('dmin', 0), 2),
+        round(earthquake_data.get('gap', 0), 1),
+        int(earthquake_data['Year']),
+        int(earthquake_data['Month'])
+    )
+
     # Determinar nivel de riesgo
     if probability >= 0.7:
         risk_level = "🔴 Alto"
@@ -93,7 +144,10 @@ def predict_tsunami(earthquake_data):
         risk_factors.append("⚠️ Magnitud muy alta (≥7.5)")
     if earthquake_data['depth'] < 70:
         risk_factors.append("⚠️ Terremoto superficial (<70km)")
-    if processed['ocean_proximity'] == 1:
+    ocean_proximity = int(calculate_ocean_proximity(
+        earthquake_data['latitude'], earthquake_data['longitude']
+    ))
+    if ocean_proximity == 1:
         risk_factors.append("⚠️ Cerca de zona oceánica de riesgo")
     if earthquake_data.get('mmi', 0) >= 6:
         risk_factors.append("⚠️ Intensidad percibida alta")
@@ -106,6 +160,65 @@ def predict_tsunami(earthquake_data):
         'risk_factors': risk_factors
     }
 
+# Plantilla del gauge de probabilidad, construida una sola vez
+@st.cache_resource
+def _gauge_template():
+    """Figura base del gauge; cada predicción solo actualiza valor y color"""
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=0,
+        title={'text': "Probabilidad de Tsunami"},
+        gauge={
+            'axis': {'range': [None, 100]},
+            'bar': {'color': "#28a745"},
+            'steps': [
+                {'range': [0, 30], 'color': "#d4edda"},
+                {'range': [30, 70], 'color': "#fff3cd"},
+                {'range': [70, 100], 'color': "#f8d7da"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 70
+            }
+        }
+    ))
+    fig.update_layout(height=300)
+    return fig
+
+# Función cacheada para el mapa de calor magnitud-profundidad
+@st.cache_data(show_spinner=False)
+def compute_risk_heatmap(mag_values, depth_values, lat, lon):
+    """Calcula la malla de probabilidades magnitud-profundidad en una sola predicción"""
+    if model is None:
+        return None
+
+    MG, DG = np.meshgrid(mag_values, depth_values, indexing='ij')
+    n = MG.size
+
+    df = pd.DataFrame({
+        'magnitude': MG.ravel(),
+        'depth': DG.ravel(),
+        'latitude': np.full(n, lat),
+        'longitude': np.full(n, lon),
+        'cdi': np.full(n, 5.0),
+        'mmi': np.full(n, 6.0),
+        'sig': np.full(n, 800),
+        'nst': np.full(n, 50),
+        'dmin': np.full(n, 1.0),
+        'gap': np.full(n, 100.0),
+        'Year': np.full(n, 2024),
+        'Month': np.full(n, 1)
+    })
+
+    # Ingeniería de características (vectorizada)
+    engineer_batch_features(df)
+
+    probs = _fast_predictor()(
+        df[list(feature_names)].to_numpy(dtype=np.float32)
+    )
+    return probs.reshape(len(mag_values), len(depth_values)) * 100
+
 # Interfaz principal
 st.title("🌊 Sistema de Predicción de Tsunamis")
 st.markdown("### Sistema de alerta temprana basado en Machine Learning")
@@ -261,27 +374,10 @@ with tab1:
                 if result:
                     st.markdown(f"### {result['risk_level']}")
                     
-                    # Gauge de probabilidad
-                    fig = go.Figure(go.Indicator(
-                        mode="gauge+number",
-                        value=result['probability'] * 100,
-                        title={'text': "Probabilidad de Tsunami"},
-                        gauge={
-                            'axis': {'range': [None, 100]},
-                            'bar': {'color': result['risk_color']},
-                            'steps': [
-                                {'range': [0, 30], 'color': "#d4edda"},
-                                {'range': [30, 70], 'color': "#fff3cd"},
-                                {'range': [70, 100], 'color': "#f8d7da"}
-                            ],
-                            'threshold': {
-                                'line': {'color': "red", 'width': 4},
-                                'thickness': 0.75,
-                                'value': 70
-                            }
-                        }
-                    ))
-                    fig.update_layout(height=300)
+                    # Gauge de probabilidad (plantilla cacheada)
+                    fig = _gauge_template()
+                    fig.data[0].value = result['probability'] * 100
+                    fig.data[0].gauge.bar.color = result['risk_color']
                     st.plotly_chart(fig, use_container_width=True)
                     
                     # Factores de riesgo
@@ -342,29 +438,11 @@ with tab2:
     
     lat_test = 35.0
     lon_test = 140.0
-    
-    probs = []
-    for mag in mag_range:
-        row_probs = []
-        for dep in depth_range:
-            test_data = {
-                'magnitude': mag,
-                'depth': dep,
-                'latitude': lat_test,
-                'longitude': lon_test,
-                'cdi': 5.0,
-                'mmi': 6.0,
-                'sig': 800,
-                'nst': 50,
-                'dmin': 1.0,
-                'gap': 100.0,
-                'Year': 2024,
-                'Month': 1
-            }
-            result = predict_tsunami(test_data)
-            row_probs.append(result['probability'] * 100 if result else 0)
-        probs.append(row_probs)
-    
+
+    probs = compute_risk_heatmap(mag_range, depth_range, lat_test, lon_test)
+    if probs is None:
+        probs = np.zeros((len(mag_range), len(depth_range)))
+
     fig = go.Figure(data=go.Heatmap(
         z=probs,
         x=depth_range,
@@ -2,10 +2,17 @@ import streamlit as st
 import pandas as pd
 import requests
 from datetime import datetime, timedelta
-import time
 import json
 import joblib
 import numpy as np
+import pydeck as pdk
+from urllib3.util.retry import Retry
+
+from utils import (
+    build_fast_predictor,
+    calculate_ocean_proximity,
+    engineer_batch_features,
+)
 
 st.set_page_config(
     page_title="Monitoreo en Tiempo Real - Tsunamis",
@@ -21,7 +28,17 @@ def load_model():
         model = joblib.load('model.pkl')
         scaler = joblib.load('scaler.pkl')
         with open('features.json', 'r') as f:
-            feature_names = json.load(f)
+            feature_names = tuple(json.load(f))
+        # Fijar float32 de extremo a extremo: los árboles de sklearn ya
+        # recorren float32 internamente, así el escalado no promociona
+        # la entrada a float64
+        scaler.mean_ = scaler.mean_.astype(np.float32)
+        scaler.scale_ = scaler.scale_.astype(np.float32)
+        # Calentamiento: la primera predicción paga la inicialización de
+        # rutas Cython y cachés de dispatch de NumPy; hacerla aquí la deja
+        # pagada una sola vez por proceso (load_model es cache_resource)
+        warmup = np.zeros((1, len(feature_names)), dtype=np.float32)
+        model.predict_proba(scaler.transform(warmup))
         return model, scaler, feature_names
     except Exception as e:
         st.error(f"Error al cargar el modelo: {e}")
@@ -29,159 +46,209 @@ def load_model():
 
 model, scaler, feature_names = load_model()
 
+# Predictor por lotes, compilado a ONNX si skl2onnx/onnxruntime están
+# instalados; si no, sklearn directamente
+@st.cache_resource
+def _fast_predictor():
+    """Predictor por lotes construido una sola vez por proceso"""
+    return build_fast_predictor(model, scaler, len(feature_names))
+
+# Sesión HTTP compartida: keep-alive amortiza el handshake TCP/TLS
+# entre sondeos consecutivos a USGS
+@st.cache_resource
+def _usgs_session():
+    """Crear una sesión requests reutilizable con reintentos hacia USGS"""
+    session = requests.Session()
+    session.headers.update({'User-Agent': 'tsunami-app'})
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=2,
+        max_retries=Retry(total=2, backoff_factor=0.3)
+    )
+    session.mount('https://', adapter)
+    return session
+
+# Función cacheada para consultar la API de USGS
+@st.cache_data(ttl=60, max_entries=32, show_spinner=False)
+def _fetch_usgs(start_iso, end_iso, min_magnitude):
+    """Consultar la API de USGS y devolver los terremotos como DataFrame columnar"""
+    # Se mantiene geojson: el formato csv de USGS no incluye cdi/mmi/sig,
+    # que son características del modelo. El limit acota el payload en
+    # ventanas de 24h con magnitud mínima baja; con orden descendente por
+    # tiempo, si se alcanza el límite se conservan los eventos más recientes.
+    params = {
+        'format': 'geojson',
+        'starttime': start_iso,
+        'endtime': end_iso,
+        'minmagnitude': min_magnitude,
+        'orderby': 'time',
+        'limit': 2000
+    }
+
+    response = _usgs_session().get(
+        "https://earthquake.usgs.gov/fdsnws/event/1/query",
+        params=params,
+        timeout=10
+    )
+    response.raise_for_status()
+
+    features = response.json().get('features', [])
+    n = len(features)
+
+    # Construcción columnar: un solo bucle rellena arrays preasignados en
+    # lugar de un dict por evento que luego habría que re-materializar
+    cols = {
+        name: np.empty(n, dtype=dtype)
+        for name, dtype in (
+            ('magnitude', 'f4'), ('depth', 'f4'), ('latitude', 'f4'),
+            ('longitude', 'f4'), ('sig', 'i4'), ('mmi', 'f4'), ('cdi', 'f4'),
+            ('nst', 'i4'), ('dmin', 'f4'), ('gap', 'f4'), ('time', 'i8'),
+            ('tsunami', 'i1'), ('id', object), ('place', object), ('url', object)
+        )
+    }
+
+    for i, feature in enumerate(features):
+        props = feature['properties']
+        coords = feature['geometry']['coordinates']
+
+        cols['id'][i] = feature['id']
+        cols['time'][i] = props['time']
+        cols['magnitude'][i] = (
+            props['mag'] if props['mag'] is not None
+            else INPUT_DEFAULTS['magnitude']
+        )
+        cols['place'][i] = props['place']
+        cols['longitude'][i] = coords[0]
+        cols['latitude'][i] = coords[1]
+        cols['depth'][i] = (
+            coords[2] if coords[2] is not None else INPUT_DEFAULTS['depth']
+        )
+        cols['sig'][i] = props.get('sig') or INPUT_DEFAULTS['sig']
+        cols['mmi'][i] = props.get('mmi') or INPUT_DEFAULTS['mmi']
+        cols['cdi'][i] = props.get('cdi') or INPUT_DEFAULTS['cdi']
+        cols['nst'][i] = props.get('nst') or INPUT_DEFAULTS['nst']
+        cols['dmin'][i] = props.get('dmin') or INPUT_DEFAULTS['dmin']
+        cols['gap'][i] = props.get('gap') or INPUT_DEFAULTS['gap']
+        cols['url'][i] = props.get('url', '')
+        cols['tsunami'][i] = props.get('tsunami') or 0
+
+    earthquakes = pd.DataFrame(cols)
+    earthquakes['time'] = pd.to_datetime(earthquakes['time'], unit='ms')
+    return earthquakes
+
 # Función para obtener terremotos de USGS
 def fetch_recent_earthquakes(minutes=60, min_magnitude=5.0):
     """Obtener terremotos recientes de USGS API"""
     try:
-        end_time = datetime.utcnow()
+        # Redondear al minuto para que la clave de caché sea estable dentro del TTL
+        end_time = datetime.utcnow().replace(second=0, microsecond=0)
         start_time = end_time - timedelta(minutes=minutes)
-        
-        params = {
-            'format': 'geojson',
-            'starttime': start_time.strftime('%Y-%m-%dT%H:%M:%S'),
-            'endtime': end_time.strftime('%Y-%m-%dT%H:%M:%S'),
-            'minmagnitude': min_magnitude,
-            'orderby': 'time-asc'
-        }
-        
-        response = requests.get(
-            "https://earthquake.usgs.gov/fdsnws/event/1/query",
-            params=params,
-            timeout=10
+
+        return _fetch_usgs(
+            start_time.strftime('%Y-%m-%dT%H:%M:%S'),
+            end_time.strftime('%Y-%m-%dT%H:%M:%S'),
+            min_magnitude
         )
-        response.raise_for_status()
-        
-        data = response.json()
-        earthquakes = []
-        
-        for feature in data.get('features', []):
-            props = feature['properties']
-            coords = feature['geometry']['coordinates']
-            
-            earthquake = {
-                'id': feature['id'],
-                'time': datetime.fromtimestamp(props['time']/1000),
-                'magnitude': props['mag'],
-                'place': props['place'],
-                'longitude': coords[0],
-                'latitude': coords[1],
-                'depth': coords[2],
-                'sig': props.get('sig', 1000),
-                'mmi': props.get('mmi', 5),
-                'cdi': props.get('cdi', 5),
-                'nst': props.get('nst', 50),
-                'dmin': props.get('dmin', 1.0),
-                'gap': props.get('gap', 100.0),
-                'url': props.get('url', ''),
-                'tsunami': props.get('tsunami', 0)
-            }
-            
-            earthquakes.append(earthquake)
-        
-        return earthquakes
-        
+
     except Exception as e:
         st.error(f"Error al obtener datos de USGS: {e}")
-        return []
-
-# Función para calcular proximidad oceánica
-def calculate_ocean_proximity(lat, lon):
-    """Calcula si está cerca de zonas de riesgo de tsunami"""
-    pacific_ring = (
-        ((lat > -60) and (lat < 60)) and
-        (((lon > 120) and (lon < 180)) or ((lon > -180) and (lon < -60)))
-    )
-    indian_ocean = ((lat > -45) and (lat < 25)) and ((lon > 40) and (lon < 120))
-    caribbean = ((lat > 5) and (lat < 25)) and ((lon > -90) and (lon < -55))
-    return int(pacific_ring or indian_ocean or caribbean)
+        return pd.DataFrame()
+
+# Niveles de riesgo indexados por np.digitize sobre RISK_BINS
+RISK_BINS = np.array([0.2, 0.4, 0.6, 0.8])
+RISK_LEVELS = ("Muy Bajo", "Bajo", "Moderado", "Alto", "Muy Alto")
+RISK_COLORS = ("#10b981", "#84cc16", "#f59e0b", "#f97316", "#ef4444")
+RISK_EMOJIS = ("🟢", "🟢", "🟡", "🟠", "🔴")
+
+# Tamaño de lote a partir del cual se reparte predict_proba entre hilos
+PARALLEL_BATCH_THRESHOLD = 256
+
+# Defaults para valores faltantes del feed de USGS
+INPUT_DEFAULTS = {
+    'magnitude': 5.0,
+    'depth': 10.0,
+    'latitude': 0.0,
+    'longitude': 0.0,
+    'sig': 1000,
+    'mmi': 5.0,
+    'cdi': 5.0,
+    'nst': 50,
+    'dmin': 1.0,
+    'gap': 100.0,
+}
+
+# Función cacheada de scoring: las filas ya limpias son hasheables, así que
+# reruns que solo cambian el umbral de alerta no vuelven a invocar sklearn
+@st.cache_data(ttl=300, show_spinner=False)
+def _score_earthquakes(rows):
+    """Calcula la probabilidad de tsunami por id a partir de tuplas (id, features...)"""
+    ids = [row[0] for row in rows]
+    columns = tuple(INPUT_DEFAULTS) + ('Year', 'Month')
+    col = {
+        name: np.array([row[i + 1] for row in rows], dtype=np.float32)
+        for i, name in enumerate(columns)
+    }
+
+    # Ingeniería de características (vectorizada)
+    engineer_batch_features(col)
+
+    # Matriz en el orden exacto de feature_names, sin proyección pandas
+    X = np.stack([col[name] for name in feature_names], axis=1)
+    predict = _fast_predictor()
+
+    # Para ventanas grandes, trocear la predicción entre hilos: tanto los
+    # árboles de sklearn como onnxruntime liberan el GIL al predecir
+    if len(X) >= PARALLEL_BATCH_THRESHOLD:
+        chunks = np.array_split(X, joblib.cpu_count())
+        results = joblib.Parallel(n_jobs=-1, prefer='threads')(
+            joblib.delayed(predict)(chunk) for chunk in chunks
+        )
+        probabilities = np.concatenate(results)
+    else:
+        probabilities = predict(X)
+
+    return dict(zip(ids, (float(p) for p in probabilities)))
+
+# Vista base del mapa, construida una sola vez y reutilizada entre reruns
+@st.cache_resource
+def _map_view_state():
+    """Vista inicial del mapa de terremotos"""
+    return pdk.ViewState(latitude=0, longitude=0, zoom=1)
+
+# Columnas de riesgo que añade el scoring
+RISK_COLUMNS = ('probability', 'risk_level', 'risk_color', 'risk_emoji')
 
 # Función para predecir riesgo
-def predict_tsunami_risk(earthquake):
-    """Predecir riesgo de tsunami"""
-    if model is None:
-        return None
-    
+def predict_tsunami_risk_batch(earthquakes):
+    """Devuelve el DataFrame de terremotos con las columnas de riesgo añadidas"""
+    empty = earthquakes.head(0).assign(**{name: [] for name in RISK_COLUMNS})
+    if model is None or earthquakes.empty:
+        return empty
+
     try:
-        # Preparar datos con defaults para valores faltantes
-        defaults = {
-            'magnitude': 5.0,
-            'depth': 10.0,
-            'latitude': 0.0,
-            'longitude': 0.0,
-            'sig': 1000,
-            'mmi': 5.0,
-            'cdi': 5.0,
-            'nst': 50,
-            'dmin': 1.0,
-            'gap': 100.0,
-        }
-        
-        input_data = {}
-        for key in defaults:
-            val = earthquake.get(key, defaults[key])
-            if val is None or (isinstance(val, float) and pd.isna(val)):
-                val = defaults[key]
-            input_data[key] = val
-        
-        # Añadir Year y Month
-        dt = earthquake['time']
-        input_data['Year'] = dt.year
-        input_data['Month'] = dt.month
-        
-        # Ingeniería de características
-        df = pd.DataFrame([input_data])
-        
-        lat = df['latitude'].iloc[0]
-        lon = df['longitude'].iloc[0]
-        df['ocean_proximity'] = calculate_ocean_proximity(lat, lon)
-        df['mag_depth_ratio'] = df['magnitude'] / (df['depth'] + 1)
-        df['intensity_score'] = (
-            df['magnitude'] * 0.5 + 
-            df['mmi'] * 0.3 + 
-            df['sig'] / 100 * 0.2
-        )
-        df['shallow_strong'] = (
-            (df['depth'] < 70) & 
-            (df['magnitude'] > 7.5)
-        ).astype(int)
-        
-        # Predecir
-        X = df[feature_names]
-        X_scaled = scaler.transform(X)
-        probability = float(model.predict_proba(X_scaled)[0, 1])
-        
+        # Filas hasheables (los defaults ya se aplicaron al parsear el feed)
+        rows = tuple(zip(
+            earthquakes['id'],
+            *(earthquakes[key] for key in INPUT_DEFAULTS),
+            earthquakes['time'].dt.year,
+            earthquakes['time'].dt.month
+        ))
+
+        scores = _score_earthquakes(rows)
+        probabilities = np.array([scores[eq_id] for eq_id in earthquakes['id']])
+
         # Clasificar riesgo
-        if probability < 0.2:
-            risk_level = "Muy Bajo"
-            risk_color = "#10b981"
-            risk_emoji = "🟢"
-        elif probability < 0.4:
-            risk_level = "Bajo"
-            risk_color = "#84cc16"
-            risk_emoji = "🟢"
-        elif probability < 0.6:
-            risk_level = "Moderado"
-            risk_color = "#f59e0b"
-            risk_emoji = "🟡"
-        elif probability < 0.8:
-            risk_level = "Alto"
-            risk_color = "#f97316"
-            risk_emoji = "🟠"
-        else:
-            risk_level = "Muy Alto"
-            risk_color = "#ef4444"
-            risk_emoji = "🔴"
-        
-        return {
-            'probability': probability,
-            'risk_level': risk_level,
-            'risk_color': risk_color,
-            'risk_emoji': risk_emoji
-        }
-        
+        buckets = np.digitize(probabilities, RISK_BINS)
+        result = earthquakes.copy()
+        result['probability'] = probabilities
+        result['risk_level'] = np.take(RISK_LEVELS, buckets)
+        result['risk_color'] = np.take(RISK_COLORS, buckets)
+        result['risk_emoji'] = np.take(RISK_EMOJIS, buckets)
+        return result
+
     except Exception as e:
         st.error(f"Error en predicción: {e}")
-        return None
+        return empty
 
 # Título
 st.title("🔴 Monitoreo de Terremotos en Tiempo Real")
@@ -241,158 +308,162 @@ with st.sidebar:
     Los datos del USGS se actualizan continuamente.
     """)
 
-# Obtener datos
-with st.spinner("🌍 Obteniendo datos de terremotos..."):
-    earthquakes = fetch_recent_earthquakes(
-        minutes=time_window,
-        min_magnitude=min_magnitude
-    )
+# Panel en vivo: st.fragment limita el rerun del auto-refresh a este
+# bloque, sin re-ejecutar la carga del modelo ni la barra lateral
+@st.fragment(run_every=refresh_interval if auto_refresh else None)
+def _live_panel():
+    """Obtener, analizar y mostrar los terremotos de la ventana actual"""
+    # Obtener datos
+    with st.spinner("🌍 Obteniendo datos de terremotos..."):
+        earthquakes = fetch_recent_earthquakes(
+            minutes=time_window,
+            min_magnitude=min_magnitude
+        )
 
-# Estadísticas generales
-col1, col2, col3, col4 = st.columns(4)
+    # Analizar todos los terremotos en una sola pasada y reutilizar el resultado
+    earthquakes_with_risk = predict_tsunami_risk_batch(earthquakes)
 
-with col1:
-    st.metric("Total Terremotos", len(earthquakes))
+    # Estadísticas generales
+    col1, col2, col3, col4 = st.columns(4)
 
-with col2:
-    if earthquakes:
-        max_mag = max(eq['magnitude'] for eq in earthquakes)
-        st.metric("Magnitud Máxima", f"{max_mag:.1f}")
-    else:
-        st.metric("Magnitud Máxima", "N/A")
-
-with col3:
-    alerts_count = 0
-    if earthquakes and model is not None:
-        for eq in earthquakes:
-            risk = predict_tsunami_risk(eq)
-            if risk and risk['probability'] >= alert_threshold:
-                alerts_count += 1
-    st.metric("Alertas de Tsunami", alerts_count)
-
-with col4:
-    st.metric("Última actualización", datetime.now().strftime("%H:%M:%S"))
-
-st.divider()
-
-# Mostrar terremotos
-if not earthquakes:
-    st.info(f"ℹ️ No se encontraron terremotos de magnitud ≥{min_magnitude} en los últimos {time_window} minutos.")
-else:
-    st.subheader(f"📋 Terremotos Detectados ({len(earthquakes)})")
-    
-    # Analizar cada terremoto
-    earthquakes_with_risk = []
-    for eq in earthquakes:
-        risk = predict_tsunami_risk(eq)
-        if risk:
-            eq['risk'] = risk
-            earthquakes_with_risk.append(eq)
-    
-    # Ordenar por probabilidad de tsunami (descendente)
-    earthquakes_with_risk.sort(key=lambda x: x['risk']['probability'], reverse=True)
-    
-    # Tabs para diferentes vistas
-    tab1, tab2, tab3 = st.tabs(["🚨 Alertas Activas", "📊 Todos los Eventos", "🗺️ Mapa"])
-    
-    with tab1:
-        high_risk = [eq for eq in earthquakes_with_risk if eq['risk']['probability'] >= alert_threshold]
-        
-        if not high_risk:
-            st.success(f"✅ No hay alertas activas (umbral: {alert_threshold*100:.0f}%)")
+    with col1:
+        st.metric("Total Terremotos", len(earthquakes))
+
+    with col2:
+        if not earthquakes.empty:
+            st.metric("Magnitud Máxima", f"{earthquakes['magnitude'].max():.1f}")
         else:
-            st.warning(f"⚠️ {len(high_risk)} alerta(s) detectada(s)")
-            
-            for eq in high_risk:
-                risk = eq['risk']
+            st.metric("Magnitud Máxima", "N/A")
+
+    with col3:
+        alerts_count = int(
+            (earthquakes_with_risk['probability'] >= alert_threshold).sum()
+        )
+        st.metric("Alertas de Tsunami", alerts_count)
+
+    with col4:
+        st.metric("Última actualización", datetime.now().strftime("%H:%M:%S"))
+
+    st.divider()
+
+    # Mostrar terremotos
+    if earthquakes.empty:
+        st.info(f"ℹ️ No se encontraron terremotos de magnitud ≥{min_magnitude} en los últimos {time_window} minutos.")
+    else:
+        st.subheader(f"📋 Terremotos Detectados ({len(earthquakes)})")
+
+        # Ordenar por probabilidad de tsunami (descendente)
+        earthquakes_with_risk = earthquakes_with_risk.sort_values(
+            'probability', ascending=False
+        )
+
+        # Tabs para diferentes vistas
+        tab1, tab2, tab3 = st.tabs(["🚨 Alertas Activas", "📊 Todos los Eventos", "🗺️ Mapa"])
+
+        with tab1:
+            high_risk = earthquakes_with_risk[
+                earthquakes_with_risk['probability'] >= alert_threshold
+            ]
+
+            if high_risk.empty:
+                st.success(f"✅ No hay alertas activas (umbral: {alert_threshold*100:.0f}%)")
+            else:
+                st.warning(f"⚠️ {len(high_risk)} alerta(s) detectada(s)")
+
+                for eq in high_risk.itertuples():
+                    with st.expander(
+                        f"{eq.risk_emoji} M{eq.magnitude:.1f} - {eq.place} - "
+                        f"Riesgo: {eq.probability*100:.1f}%",
+                        expanded=True
+                    ):
+                        col_a, col_b = st.columns([2, 1])
+
+                        with col_a:
+                            st.markdown(f"""
+                            **📍 Ubicación:** {eq.place}  
+                            **🕐 Hora:** {eq.time.strftime('%Y-%m-%d %H:%M:%S')} UTC  
+                            **📏 Magnitud:** {eq.magnitude:.1f}  
+                            **⬇️ Profundidad:** {eq.depth:.1f} km  
+                            **🌐 Coordenadas:** {eq.latitude:.3f}, {eq.longitude:.3f}  
+                            """)
+
+                            if eq.url:
+                                st.markdown(f"[🔗 Ver detalles en USGS]({eq.url})")
+
+                        with col_b:
+                            st.markdown(f"""
+                            ### {eq.risk_emoji} {eq.risk_level}
+                            **Probabilidad:** {eq.probability*100:.1f}%
+                            """)
+                            st.markdown(
+                                f"<div style='background-color: {eq.risk_color}; "
+                                f"height: 10px; border-radius: 5px;'></div>",
+                                unsafe_allow_html=True
+                            )
+
+                            if eq.probability >= 0.7:
+                                st.error("🚨 EVACUACIÓN INMEDIATA")
+                            elif eq.probability >= 0.5:
+                                st.warning("⚠️ PREPARAR EVACUACIÓN")
+                            else:
+                                st.info("ℹ️ MANTENERSE ALERTA")
+
+        with tab2:
+            for eq in earthquakes_with_risk.itertuples():
                 with st.expander(
-                    f"{risk['risk_emoji']} M{eq['magnitude']:.1f} - {eq['place']} - "
-                    f"Riesgo: {risk['probability']*100:.1f}%",
-                    expanded=True
+                    f"{eq.risk_emoji} M{eq.magnitude:.1f} - {eq.place} - "
+                    f"{eq.time.strftime('%H:%M:%S')} UTC"
                 ):
-                    col_a, col_b = st.columns([2, 1])
-                    
+                    col_a, col_b, col_c = st.columns([2, 1, 1])
+
                     with col_a:
                         st.markdown(f"""
-                        **📍 Ubicación:** {eq['place']}  
-                        **🕐 Hora:** {eq['time'].strftime('%Y-%m-%d %H:%M:%S')} UTC  
-                        **📏 Magnitud:** {eq['magnitude']:.1f}  
-                        **⬇️ Profundidad:** {eq['depth']:.1f} km  
-                        **🌐 Coordenadas:** {eq['latitude']:.3f}, {eq['longitude']:.3f}  
+                        **Ubicación:** {eq.place}  
+                        **Hora:** {eq.time.strftime('%Y-%m-%d %H:%M:%S')} UTC  
+                        **Magnitud:** {eq.magnitude:.1f}  
+                        **Profundidad:** {eq.depth:.1f} km  
+                        **Coordenadas:** {eq.latitude:.3f}, {eq.longitude:.3f}  
                         """)
-                        
-                        if eq['url']:
-                            st.markdown(f"[🔗 Ver detalles en USGS]({eq['url']})")
-                    
+
                     with col_b:
-                        st.markdown(f"""
-                        ### {risk['risk_emoji']} {risk['risk_level']}
-                        **Probabilidad:** {risk['probability']*100:.1f}%
-                        """)
-                        st.markdown(
-                            f"<div style='background-color: {risk['risk_color']}; "
-                            f"height: 10px; border-radius: 5px;'></div>",
-                            unsafe_allow_html=True
-                        )
-                        
-                        if risk['probability'] >= 0.7:
-                            st.error("🚨 EVACUACIÓN INMEDIATA")
-                        elif risk['probability'] >= 0.5:
-                            st.warning("⚠️ PREPARAR EVACUACIÓN")
-                        else:
-                            st.info("ℹ️ MANTENERSE ALERTA")
-    
-    with tab2:
-        for eq in earthquakes_with_risk:
-            risk = eq['risk']
-            
-            with st.expander(
-                f"{risk['risk_emoji']} M{eq['magnitude']:.1f} - {eq['place']} - "
-                f"{eq['time'].strftime('%H:%M:%S')} UTC"
-            ):
-                col_a, col_b, col_c = st.columns([2, 1, 1])
-                
-                with col_a:
-                    st.markdown(f"""
-                    **Ubicación:** {eq['place']}  
-                    **Hora:** {eq['time'].strftime('%Y-%m-%d %H:%M:%S')} UTC  
-                    **Magnitud:** {eq['magnitude']:.1f}  
-                    **Profundidad:** {eq['depth']:.1f} km  
-                    **Coordenadas:** {eq['latitude']:.3f}, {eq['longitude']:.3f}  
-                    """)
-                
-                with col_b:
-                    st.metric("Riesgo de Tsunami", f"{risk['probability']*100:.1f}%")
-                    st.markdown(f"**{risk['risk_level']}**")
-                
-                with col_c:
-                    st.metric("Significancia", eq['sig'])
-                    if eq['url']:
-                        st.markdown(f"[🔗 USGS]({eq['url']})")
-    
-    with tab3:
-        st.markdown("### 🗺️ Ubicación de Terremotos")
-        
-        # Preparar datos para el mapa
-        map_data = pd.DataFrame([{
-            'lat': eq['latitude'],
-            'lon': eq['longitude'],
-            'magnitude': eq['magnitude'],
-            'risk': eq['risk']['probability'] * 100,
-            'place': eq['place']
-        } for eq in earthquakes_with_risk])
+                        st.metric("Riesgo de Tsunami", f"{eq.probability*100:.1f}%")
+                        st.markdown(f"**{eq.risk_level}**")
+
+                    with col_c:
+                        st.metric("Significancia", int(eq.sig))
+                        if eq.url:
+                            st.markdown(f"[🔗 USGS]({eq.url})")
+
+        with tab3:
+            st.markdown("### 🗺️ Ubicación de Terremotos")
+
+            # Preparar datos para el mapa (selección columnar, ya ordenada por riesgo)
+            map_data = earthquakes_with_risk[
+                ['latitude', 'longitude', 'magnitude', 'place']
+            ].rename(columns={'latitude': 'lat', 'longitude': 'lon'})
+            map_data['risk'] = earthquakes_with_risk['probability'].to_numpy() * 100
         
-        # Mostrar mapa
-        st.map(map_data, zoom=1, use_container_width=True)
+            # Mostrar mapa: una sola capa de puntos, con radio por magnitud
+            # y color por riesgo, en lugar del Deck que st.map reconstruye
+            layer = pdk.Layer(
+                'ScatterplotLayer',
+                data=map_data,
+                get_position='[lon, lat]',
+                get_radius='magnitude * 20000',
+                get_fill_color='[255 * risk / 100, 50, 50, 180]',
+                pickable=True
+            )
+            st.pydeck_chart(pdk.Deck(
+                layers=[layer],
+                initial_view_state=_map_view_state(),
+                tooltip={'text': '{place}\nM{magnitude} - Riesgo: {risk}%'}
+            ), use_container_width=True)
         
-        # Tabla resumen
-        st.dataframe(
-            map_data.sort_values('risk', ascending=False),
-            use_container_width=True,
-            hide_index=True
-        )
+            # Tabla resumen (earthquakes_with_risk ya viene ordenada por riesgo)
+            st.dataframe(
+                map_data,
+                use_container_width=True,
+                hide_index=True
+            )
 
-# Auto-refresh
-if auto_refresh:
-    time.sleep(refresh_interval)
-    st.rerun()
+_live_panel()
@@ -0,0 +1,75 @@
+import numpy as np
+
+# Función para calcular proximidad a océanos
+def calculate_ocean_proximity(lat, lon):
+    """Calcula si está cerca de zonas de riesgo de tsunami
+
+    Acepta escalares o arrays NumPy y devuelve 0/1 (int8) con la misma forma.
+    """
+    lat = np.asarray(lat)
+    lon = np.asarray(lon)
+    pacific_ring = (
+        ((lat > -60) & (lat < 60)) &
+        (((lon > 120) & (lon < 180)) | ((lon > -180) & (lon < -60)))
+    )
+    indian_ocean = ((lat > -45) & (lat < 25)) & ((lon > 40) & (lon < 120))
+    caribbean = ((lat > 5) & (lat < 25)) & ((lon > -90) & (lon < -55))
+    return (pacific_ring | indian_ocean | caribbean).astype(np.int8)
+
+# Predictor por lotes, especializado a este modelo si ONNX está disponible
+def build_fast_predictor(model, scaler, n_features):
+    """Devuelve una función por lotes X (N x n_features) -> probabilidad
+
+    Si skl2onnx y onnxruntime están instalados, compila escalado + modelo
+    a un grafo ONNX especializado para este modelo concreto, bastante más
+    rápido que el recorrido genérico de árboles de sklearn en lotes. Si
+    no lo están, usa scaler.transform + model.predict_proba directamente.
+    """
+    try:
+        import onnxruntime as ort
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+        from sklearn.pipeline import make_pipeline
+
+        onx = convert_sklearn(
+            make_pipeline(scaler, model),
+            initial_types=[('input', FloatTensorType([None, n_features]))],
+            options={'zipmap': False}
+        )
+        session = ort.InferenceSession(
+            onx.SerializeToString(), providers=['CPUExecutionProvider']
+        )
+        input_name = session.get_inputs()[0].name
+
+        def predict(X):
+            X = np.ascontiguousarray(X, dtype=np.float32)
+            # Salidas con zipmap=False: [etiquetas, probabilidades]
+            return session.run(None, {input_name: X})[1][:, 1]
+
+    except Exception:
+        def predict(X):
+            return model.predict_proba(scaler.transform(X))[:, 1]
+
+    return predict
+
+# Función para ingeniería de características por lotes
+def engineer_batch_features(col):
+    """Añade las características derivadas a un lote de columnas
+
+    `col` puede ser un dict de arrays NumPy o un DataFrame; se calculan
+    las cuatro características derivadas en una pasada vectorizada.
+    """
+    col['ocean_proximity'] = calculate_ocean_proximity(
+        col['latitude'], col['longitude']
+    ).astype(np.float32)
+    col['mag_depth_ratio'] = col['magnitude'] / (col['depth'] + 1)
+    col['intensity_score'] = (
+        col['magnitude'] * 0.5 +
+        col['mmi'] * 0.3 +
+        col['sig'] / 100 * 0.2
+    )
+    col['shallow_strong'] = (
+        (col['depth'] < 70) &
+        (col['magnitude'] > 7.5)
+    ).astype(np.float32)
+    return col